@@ -1,14 +1,14 @@
 import os
+import csv
 import json
+import functools
 import logging
 import traceback
 from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, flash, session
 from werkzeug.utils import secure_filename
-from models import Transaction, TransactionSummary, MonthlyStats, DashboardData, TransactionType
-from decimal import Decimal
 from pathlib import Path
-from utils.csv_processor import CSVProcessor
+from utils import CSVProcessor, EXPECTED_COLUMNS
 
 # Configure logging first
 LOG_FOLDER = 'logs'
@@ -58,6 +58,18 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+@functools.lru_cache(maxsize=8)
+def load_dataset(filename, mtime_ns):
+    """Load and summarize an uploaded file once per modification time"""
+    # mtime_ns is only part of the cache key, so a re-uploaded file is reloaded
+    frame = processor.load_transactions(Path(app.config['UPLOAD_FOLDER']) / filename)
+    return frame, frame.summary()
+
+def get_dataset(filename):
+    """Return the cached (TransactionFrame, TransactionSummary) for an uploaded file"""
+    csv_path = Path(app.config['UPLOAD_FOLDER']) / filename
+    return load_dataset(filename, csv_path.stat().st_mtime_ns)
+
 @app.route('/')
 def home():
     logger.info('Home page accessed')
@@ -69,26 +81,9 @@ def home():
             latest_file = processed_files[0]  # Changed from -1 since list is already sorted
             logger.info(f"Loading most recent file: {latest_file}")
             
-            transactions = processor.load_all_transactions().get(latest_file, [])
-            if transactions:
-                # Calculate summary and monthly stats
-                summary = TransactionSummary(
-                    total_transactions=len(transactions),
-                    total_spent=sum(t.amount for t in transactions if t.amount < 0),
-                    total_received=sum(t.amount for t in transactions if t.amount > 0),
-                    average_transaction=sum(t.amount for t in transactions) / len(transactions) if transactions else Decimal('0'),
-                    date_range=(
-                        f"{min(t.posting_date for t in transactions).strftime('%Y-%m-%d')} to "
-                        f"{max(t.posting_date for t in transactions).strftime('%Y-%m-%d')}"
-                    ) if transactions else "No date range available"
-                )
-                
-                dashboard_data = DashboardData(
-                    transactions=transactions,
-                    summary=summary,
-                    monthly_stats={}  # You can implement monthly stats calculation here
-                )
-                session['dashboard_data'] = dashboard_data.model_dump()
+            frame, _ = get_dataset(latest_file)
+            if len(frame):
+                session['dataset_key'] = latest_file
                 return redirect(url_for('dashboard'))
             else:
                 logger.warning(f"No transactions found in {latest_file}")
@@ -141,15 +136,12 @@ def map_headers(filename):
     try:
         # Read CSV headers
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        df = pd.read_csv(filepath, nrows=0)  # Just read headers
-        headers = df.columns.tolist()
+        with open(filepath, newline='', encoding='utf-8-sig') as f:  # utf-8-sig drops an Excel BOM
+            headers = next(csv.reader(f), [])  # Just read the header row
         logger.info(f'CSV headers found: {headers}')
         
-        # Define standard headers we expect
-        standard_headers = [
-            'Details', 'Posting Date', 'Description', 
-            'Amount', 'Type', 'Balance', 'Check or Slip #'
-        ]
+        # Standard headers we expect
+        standard_headers = EXPECTED_COLUMNS
         
         if request.method == 'POST':
             # Process the mapping and continue to CSV processing
@@ -183,29 +175,22 @@ def not_found_error(error):
 def dashboard():
     logger.info('Dashboard page accessed')
     
-    if 'dashboard_data' not in session:
-        logger.warning('No dashboard data in session')
+    if 'dataset_key' not in session:
+        logger.warning('No dataset in session')
         flash('No data to display. Please upload a CSV file first.')
         return redirect(url_for('upload'))
     
     try:
-        # Get dashboard data from session
-        dashboard_data = session['dashboard_data']
-        
-        # Convert back to proper types since session storage converts to basic types
-        transactions = [Transaction(**t) for t in dashboard_data['transactions']]
-        summary = TransactionSummary(**dashboard_data['summary'])
-        monthly_stats = {
-            k: MonthlyStats(**v) 
-            for k, v in dashboard_data['monthly_stats'].items()
-        }
+        # The session only holds the filename; the data comes from the cache
+        # Rows keep amounts in cents; Decimals are only built while rendering
+        frame, summary = get_dataset(session['dataset_key'])
         
-        logger.info(f'Displaying {len(transactions)} transactions')
+        logger.info(f'Displaying {len(frame)} transactions')
         
         return render_template('dashboard.html',
-                             transactions=transactions,
+                             transactions=frame,
                              summary=summary,
-                             monthly_stats=monthly_stats)
+                             monthly_stats={})  # You can implement monthly stats calculation here
                              
     except Exception as e:
         logger.error(f'Error displaying dashboard: {str(e)}')
@@ -217,88 +202,16 @@ def dashboard():
 def process_csv(filename):
     logger.info(f'Processing CSV file: {filename}')
     try:
-        # Get file paths
-        csv_file = Path(app.config['UPLOAD_FOLDER']) / filename
+        # Process the CSV file with the vectorized processor
+        frame, _ = get_dataset(filename)
+        logger.info(f"Processed {len(frame)} transactions")
         
-        # Process the CSV file
-        df = pd.read_csv(csv_file)
-        logger.info(f"Loaded CSV with {len(df)} rows")
-        
-        # Process transactions
-        transactions = []
-        for idx, row in df.iterrows():
-            try:
-                # Skip header row if present
-                if row['Details'] == 'Details':
-                    continue
-                    
-                # Get amount and balance
-                amount = Decimal(str(row['Amount']).replace('$', '').replace(',', ''))
-                balance = Decimal(str(row['Balance']).replace('$', '').replace(',', ''))
-                
-                # Parse date
-                posting_date = datetime.strptime(str(row['Posting Date']), '%m/%d/%Y')
-                
-                # Determine transaction type
-                details = str(row['Details']).upper()
-                type_str = str(row['Type']).upper()
-                
-                if 'CREDIT' in details or 'ACH_CREDIT' in type_str:
-                    trans_type = TransactionType.ACH_CREDIT
-                elif 'DSLIP' in details or 'CHECK' in type_str:
-                    trans_type = TransactionType.CHECK_DEPOSIT
-                elif 'FEE' in type_str:
-                    trans_type = TransactionType.FEE_TRANSACTION
-                elif 'ACH_DEBIT' in type_str:
-                    trans_type = TransactionType.ACH_DEBIT
-                elif 'DEBIT_CARD' in type_str:
-                    trans_type = TransactionType.DEBIT_CARD
-                else:
-                    trans_type = TransactionType.MISC_DEBIT
-                
-                transaction = Transaction(
-                    details=details,
-                    posting_date=posting_date,
-                    description=str(row['Description']).strip(),
-                    amount=amount,
-                    transaction_type=trans_type,
-                    balance=balance,
-                    check_number=str(row['Check or Slip #']) if pd.notna(row['Check or Slip #']) else None
-                )
-                transactions.append(transaction)
-                
-            except Exception as e:
-                logger.error(f"Error processing row {idx}: {row.to_dict()}")
-                logger.error(f"Error details: {str(e)}")
-                continue
-        
-        if not transactions:
+        if not len(frame):
             logger.error('No transactions were processed')
             flash('No transactions could be processed from the file')
             return redirect(url_for('upload'))
             
-        # Calculate summary
-        summary = TransactionSummary(
-            total_transactions=len(transactions),
-            total_spent=sum(t.amount for t in transactions if t.amount < 0),
-            total_received=sum(t.amount for t in transactions if t.amount > 0),
-            average_transaction=sum(t.amount for t in transactions) / len(transactions),
-            date_range=(
-                f"{min(t.posting_date for t in transactions).strftime('%Y-%m-%d')} to "
-                f"{max(t.posting_date for t in transactions).strftime('%Y-%m-%d')}"
-            )
-        )
-        
-        # Calculate monthly stats
-        monthly_stats = {}
-        
-        # Store in session
-        dashboard_data = DashboardData(
-            transactions=transactions,
-            summary=summary,
-            monthly_stats=monthly_stats
-        )
-        session['dashboard_data'] = dashboard_data.model_dump()
+        session['dataset_key'] = filename
         
         return redirect(url_for('dashboard'))
         
@@ -1,7 +1,12 @@
+import functools
+from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
-from typing import Optional, Dict, List
+from typing import Optional, Iterator, List
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
 from pydantic import BaseModel, Field
 
 class TransactionType(str, Enum):
@@ -36,10 +41,125 @@ class MonthlyStats(BaseModel):
     largest_transaction: Decimal = Field(..., description="Largest transaction amount")
     most_common_type: str = Field(..., description="Most common transaction type")
 
-class DashboardData(BaseModel):
-    transactions: List[Transaction] = Field(..., description="List of transactions")
-    summary: TransactionSummary = Field(..., description="Transaction summary statistics")
-    monthly_stats: Dict[str, MonthlyStats] = Field(..., description="Monthly statistics")
+@functools.lru_cache(maxsize=4096)
+def cents_to_decimal(cents: int) -> Decimal:
+    """Decimal dollars for a cent amount, shared by every row with that amount"""
+    # Recurring charges repeat amounts and the dashboard reads each amount
+    # twice; running balances rarely repeat, so they are not cached
+    return Decimal(cents) / 100
+
+@dataclass(slots=True)
+class TransactionRow:
+    """One row of a TransactionFrame; money stays in cents until displayed"""
+    details: str
+    posting_date: datetime
+    description: str
+    amount_cents: int
+    transaction_type: TransactionType
+    balance_cents: int
+    check_number: Optional[str]
+
+    @property
+    def amount(self) -> Decimal:
+        return cents_to_decimal(self.amount_cents)
+
+    @property
+    def balance(self) -> Decimal:
+        return Decimal(self.balance_cents) / 100
+
+# TransactionType members indexed by the categorical codes of TransactionFrame
+_TRANSACTION_TYPE_MEMBERS = np.array(list(TransactionType), dtype=object)
+
+@dataclass
+class TransactionFrame:
+    """Columnar transaction store: one typed column per Transaction field.
+
+    Money is kept as int64 cents and details/transaction_type as categoricals,
+    so summaries are vectorized reductions instead of loops over Decimals.
+    """
+    df: pd.DataFrame
+
+    @classmethod
+    def from_columns(cls, details, posting_date, description, amount_cents,
+                     transaction_type, balance_cents, check_number) -> "TransactionFrame":
+        return cls(pd.DataFrame({
+            'details': pd.Categorical(details),
+            'posting_date': posting_date,
+            'description': description,
+            'amount': pd.Series(amount_cents, dtype='int64'),
+            'transaction_type': pd.Categorical(
+                transaction_type, categories=[t.value for t in TransactionType]
+            ),
+            'balance': pd.Series(balance_cents, dtype='int64'),
+            'check_number': pd.Series(check_number, dtype=object),
+        }))
+
+    @classmethod
+    def concat(cls, frames: List["TransactionFrame"]) -> "TransactionFrame":
+        """Join frames built from consecutive chunks of one file"""
+        if not frames:
+            return cls.from_columns([], np.array([], dtype='datetime64[ns]'), [], [], [], [], [])
+        df = pd.concat([f.df for f in frames], ignore_index=True)
+        # Each chunk only saw its own details values; union them so the
+        # column stays categorical instead of falling back to object
+        df['details'] = union_categoricals([f.df['details'] for f in frames])
+        return cls(df)
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def summary(self) -> TransactionSummary:
+        """Compute summary statistics with vectorized reductions"""
+        if self.df.empty:
+            return TransactionSummary(
+                total_transactions=0,
+                total_spent=Decimal('0'),
+                total_received=Decimal('0'),
+                average_transaction=Decimal('0'),
+                date_range="No date range available"
+            )
+
+        # One grouped pass yields both spent and received; their sum is the total
+        amount = self.df['amount']
+        by_sign = amount.groupby(np.sign(amount)).sum()
+        spent = int(by_sign.get(-1, 0))
+        received = int(by_sign.get(1, 0))
+        first_date, last_date = self.df['posting_date'].agg(['min', 'max'])
+        return TransactionSummary(
+            total_transactions=len(self.df),
+            total_spent=Decimal(spent) / 100,
+            total_received=Decimal(received) / 100,
+            average_transaction=Decimal(spent + received) / 100 / len(self.df),
+            date_range=f"{first_date.strftime('%Y-%m-%d')} to {last_date.strftime('%Y-%m-%d')}"
+        )
+
+    def __iter__(self) -> Iterator[TransactionRow]:
+        """Iterate rows for display without building Decimals or pydantic models"""
+        df = self.df
+        return map(
+            TransactionRow,
+            self._details(),
+            df['posting_date'].dt.to_pydatetime(),
+            df['description'].tolist(),
+            df['amount'].tolist(),
+            self._transaction_types(),
+            df['balance'].tolist(),
+            self._check_numbers()
+        )
+
+    def _details(self) -> List[str]:
+        # Gather from the categories so rows with the same details share one string
+        details = self.df['details'].cat
+        return np.append(details.categories.to_numpy(dtype=object), None)[details.codes.to_numpy()].tolist()
+
+    def _transaction_types(self) -> List[TransactionType]:
+        # Gather enum members by categorical code instead of converting row by row
+        return _TRANSACTION_TYPE_MEMBERS[self.df['transaction_type'].cat.codes.to_numpy()].tolist()
+
+    def _check_numbers(self) -> List[Optional[str]]:
+        # Missing check numbers may come back as NaN (e.g. from Parquet)
+        check_numbers = self.df['check_number'].astype(object)
+        return check_numbers.where(check_numbers.notna(), None).tolist()
 
 class CSVMapping(BaseModel):
     file_pattern: str = Field(..., description="Pattern to match CSV filename")
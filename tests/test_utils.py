@@ -0,0 +1,236 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import utils
+from models import TransactionType
+from utils import csv_processor
+from utils.csv_processor import (
+    CSVProcessor,
+    _parquet_path,
+    _factorize_upper,
+    _type_table,
+    classify_batch,
+    classify_transaction_types,
+    clean_cents_column,
+    parse_cents,
+    parse_posting_dates,
+)
+
+SAMPLE_CSV = Path(__file__).resolve().parent.parent / 'uploads' / 'Chase3619_Activity_20241026.CSV'
+
+HEADER = 'Details,Posting Date,Description,Amount,Type,Balance,Check or Slip #\n'
+
+
+def write_statement(path, rows):
+    """Write a small Chase-style export with the given number of rows"""
+    lines = [f'DEBIT,10/{day + 1:02d}/2024,"SHOP {day}",-{day + 1}.00,DEBIT_CARD,100.00,,\n' for day in range(rows)]
+    path.write_text(HEADER + ''.join(lines))
+
+
+def classify_row(details, type_str):
+    """Reference row-by-row version of the Details/Type ladder"""
+    details = '' if pd.isna(details) else details.upper()
+    type_str = '' if pd.isna(type_str) else type_str.upper()
+    if 'CREDIT' in details or 'ACH_CREDIT' in type_str:
+        return TransactionType.ACH_CREDIT.value
+    if 'DSLIP' in details or 'CHECK' in type_str:
+        return TransactionType.CHECK_DEPOSIT.value
+    if 'FEE' in type_str:
+        return TransactionType.FEE_TRANSACTION.value
+    if 'ACH_DEBIT' in type_str:
+        return TransactionType.ACH_DEBIT.value
+    if 'DEBIT_CARD' in type_str:
+        return TransactionType.DEBIT_CARD.value
+    return TransactionType.MISC_DEBIT.value
+
+
+class TestExports(unittest.TestCase):
+    def test_single_csv_processor(self):
+        self.assertIs(utils.CSVProcessor, csv_processor.CSVProcessor)
+
+
+class TestParseCents(unittest.TestCase):
+    def test_valid_values(self):
+        cases = {
+            '': 0,
+            '  ': 0,
+            '0.00': 0,
+            '12': 1200,
+            '12.5': 1250,
+            '-9.78': -978,
+            '+3.10': 310,
+            '$1,234.56': 123456,
+            '(12.00)': -1200,
+            '-$5': -500,
+            ' 12 ': 1200,
+            '1.005': 101,
+            '-1.005': -101,
+            '1.004': 100,
+        }
+        for text, cents in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse_cents(text), cents)
+
+    def test_invalid_values(self):
+        for text in ['abc', '1.2.3', '1e3', '$', '.', '12 USD', '1-2', '(12.00', '12)', '(-5)', '+-3', '1 2']:
+            with self.subTest(text=text):
+                self.assertIsNone(parse_cents(text))
+
+    def test_column_flags_invalid_cells(self):
+        cents, valid = clean_cents_column(pd.Series(['1.00', 'abc', '', '-2.50'], dtype='string'))
+        self.assertEqual(cents.dtype, np.int64)
+        self.assertEqual(cents.tolist(), [100, 0, 0, -250])
+        self.assertEqual(valid.tolist(), [True, False, True, True])
+
+
+class TestParsePostingDates(unittest.TestCase):
+    def test_known_formats(self):
+        column = pd.Series(
+            ['10/25/2024', '2024-10-25', '10/25/24', '10-25-2024', '1/5/2024', 'garbage', ''],
+            dtype='string'
+        )
+        dates = parse_posting_dates(column)
+        expected = [pd.Timestamp('2024-10-25')] * 4 + [pd.Timestamp('2024-01-05')]
+        self.assertEqual(dates[:5].tolist(), expected)
+        self.assertTrue(dates[5:].isna().all())
+
+
+class TestClassification(unittest.TestCase):
+    DETAILS = ['DEBIT', 'CREDIT', 'DSLIP', 'credit ', 'CHECK', None]
+    TYPES = ['ACH_CREDIT', 'ACH_DEBIT', 'DEBIT_CARD', 'FEE_TRANSACTION', 'CHECK_PAID',
+             'check_deposit', 'MISC', 'LOAN_PMT', None]
+
+    def random_columns(self, n=5000):
+        rng = np.random.default_rng(0)
+        details = pd.Series(rng.choice(np.array(self.DETAILS, dtype=object), n))
+        types = pd.Series(rng.choice(np.array(self.TYPES, dtype=object), n))
+        return details, types
+
+    def test_matches_row_ladder(self):
+        details, types = self.random_columns()
+        expected = [classify_row(d, t) for d, t in zip(details, types)]
+        self.assertEqual(list(classify_transaction_types(details, types)), expected)
+
+    def test_type_table_covers_every_pair(self):
+        details = pd.Index([d for d in self.DETAILS if d is not None])
+        types = pd.Index([t for t in self.TYPES if t is not None])
+        table = _type_table(details.str.upper(), types.str.upper())
+        self.assertEqual(table.shape, (len(details) + 1, len(types) + 1))
+        members = list(TransactionType)
+        for i, d in enumerate(list(details) + [None]):
+            for j, t in enumerate(list(types) + [None]):
+                with self.subTest(details=d, type=t):
+                    self.assertEqual(members[table[i, j]].value, classify_row(d, t))
+
+    def test_classify_batch_is_a_table_lookup(self):
+        details, types = self.random_columns()
+        details_u, details_codes = _factorize_upper(details)
+        types_u, type_codes = _factorize_upper(types)
+        table = _type_table(details_u, types_u)
+        codes = classify_batch(details_codes, type_codes, table)
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertEqual(codes.tolist(), [table[d, t] for d, t in zip(details_codes, type_codes)])
+
+
+@unittest.skipUnless(csv_processor.PARQUET_AVAILABLE, 'pyarrow is not installed')
+class TestParquetCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.processor = CSVProcessor(self.dir)
+
+    def load_counting_parses(self, csv_path):
+        """Load csv_path and report how many times the CSV itself was parsed"""
+        with mock.patch.object(CSVProcessor, 'process_csv', autospec=True,
+                               side_effect=CSVProcessor.process_csv) as process_csv:
+            frame = self.processor.load_transactions(csv_path)
+        return frame, process_csv.call_count
+
+    def test_case_distinct_files_get_separate_sidecars(self):
+        lower, upper = self.dir / 'stmt.csv', self.dir / 'stmt.CSV'
+        write_statement(lower, 3)
+        write_statement(upper, 1)
+        self.assertNotEqual(_parquet_path(lower), _parquet_path(upper))
+        for path, rows in [(lower, 3), (upper, 1), (lower, 3), (upper, 1)]:
+            with self.subTest(path=path.name):
+                self.assertEqual(len(self.processor.load_transactions(path)), rows)
+        self.assertTrue(_parquet_path(lower).exists())
+        self.assertTrue(_parquet_path(upper).exists())
+
+    def test_sidecar_reused_only_when_fresh(self):
+        csv_path = self.dir / 'stmt.csv'
+        write_statement(csv_path, 2)
+        self.assertEqual(self.load_counting_parses(csv_path)[1], 1)
+        self.assertEqual(self.load_counting_parses(csv_path)[1], 0)
+
+        # A CSV newer than its sidecar is parsed again
+        sidecar_mtime = _parquet_path(csv_path).stat().st_mtime_ns
+        os.utime(csv_path, ns=(sidecar_mtime, sidecar_mtime + 10 ** 9))
+        self.assertEqual(self.load_counting_parses(csv_path)[1], 1)
+
+    def test_sidecar_from_another_version_is_ignored(self):
+        csv_path = self.dir / 'stmt.csv'
+        write_statement(csv_path, 2)
+        self.processor.load_transactions(csv_path)
+        with mock.patch.object(csv_processor, 'PARQUET_CACHE_VERSION', csv_processor.PARQUET_CACHE_VERSION + 1):
+            self.assertEqual(self.load_counting_parses(csv_path)[1], 1)
+            self.assertTrue(_parquet_path(csv_path).exists())
+
+    def test_parquet_round_trip_matches_csv(self):
+        csv_path = self.dir / SAMPLE_CSV.name
+        shutil.copy(SAMPLE_CSV, csv_path)
+        expected = self.processor.process_csv(csv_path)
+        cached, parses = self.load_counting_parses(csv_path)
+        self.assertEqual(parses, 0)
+        pd.testing.assert_frame_equal(cached.df, expected.df)
+        checks = cached.df['check_number'].tolist()
+        self.assertIn(None, checks)
+        self.assertFalse(any(isinstance(value, float) for value in checks))
+
+
+@unittest.skipUnless(csv_processor.pa_csv is not None, 'pyarrow is not installed')
+class TestReaderPaths(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        # No Parquet sidecars, so every read goes through the CSV readers
+        patcher = mock.patch.object(CSVProcessor, 'save_parquet')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.processor = CSVProcessor(self.dir)
+
+    def assert_readers_agree(self, csv_path):
+        arrow = self.processor.process_csv(csv_path)
+        with mock.patch.object(csv_processor, 'pa_csv', None):
+            c_engine = self.processor.process_csv(csv_path)
+        self.assertGreater(len(arrow), 0)
+        pd.testing.assert_frame_equal(arrow.df, c_engine.df, check_categorical=False)
+
+    def test_sample_export(self):
+        self.assert_readers_agree(SAMPLE_CSV)
+
+    def test_bom_prefixed_export(self):
+        csv_path = self.dir / 'bom.CSV'
+        csv_path.write_bytes(b'\xef\xbb\xbf' + SAMPLE_CSV.read_bytes())
+        self.assert_readers_agree(csv_path)
+        self.assertEqual(len(self.processor.process_csv(csv_path)), len(self.processor.process_csv(SAMPLE_CSV)))
+
+    def test_extra_field_falls_back_to_c_engine(self):
+        lines = SAMPLE_CSV.read_text().splitlines(keepends=True)
+        lines[5] = lines[5].rstrip('\r\n') + 'EXTRA,\n'
+        csv_path = self.dir / 'extra.CSV'
+        csv_path.write_text(''.join(lines))
+        with self.assertLogs('budget_app', 'WARNING') as logs:
+            self.assert_readers_agree(csv_path)
+        self.assertTrue(any('using the C engine' in line for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,3 @@
+from utils.csv_processor import CSVProcessor, EXPECTED_COLUMNS
+
+__all__ = ['CSVProcessor', 'EXPECTED_COLUMNS']